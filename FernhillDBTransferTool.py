@@ -1,17 +1,55 @@
 import pyodbc
 import pandas as pd
+import errno
 import os
+import re
+import threading
 import logging
 import warnings
 import urllib.parse
-import PySimpleGUI as sg
-from psgtray import SystemTray
 from sqlalchemy import create_engine, text
+from pgcopy import CopyManager
 from configparser import ConfigParser
+from pathlib import Path
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from timeit import default_timer as timer
-from datetime import datetime, time
-import hashlib
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+
+
+warnings.filterwarnings('ignore', category=UserWarning, message='pandas only supports SQLAlchemy')
+
+CONFIG_PATH = Path(__file__).resolve().parent / 'config.ini'
+LOG_PATH = Path(__file__).resolve().parent / 'dbtool.log'
+STATUS_TABLE = 'fernhill_sync_status'
+STAGING_SCHEMA = 'fernhill_staging'
+# Errors from writing to a pipe whose reader closed, Windows raises EINVAL instead of EPIPE
+PIPE_CLOSED_ERRNOS = (errno.EPIPE, errno.EINVAL)
+FETCH_SIZE = 50000
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+MAX_WORKERS = 8
+BULK_LOAD_SETTINGS = (
+    "SET LOCAL synchronous_commit = off",
+    "SET LOCAL maintenance_work_mem = '512MB'",
+    "SET LOCAL work_mem = '128MB'",
+)
+UPDATE_TIMES = (time(6, 0, 0), time(18, 0, 0))
+UPDATE_WINDOW = timedelta(minutes=1)
+MAX_READ_TIMEOUT = 60000
+_LOGGER = None
+_CONFIG = None
+_CONFIG_MTIME = None
+PG_TYPES = {
+    str: 'TEXT',
+    int: 'BIGINT',
+    float: 'DOUBLE PRECISION',
+    bool: 'BOOLEAN',
+    Decimal: 'NUMERIC',
+    datetime: 'TIMESTAMP',
+    date: 'DATE',
+    time: 'TIME',
+}
 
 
 def convert_time(sec):
@@ -25,87 +63,395 @@ def convert_time(sec):
     string: Hour:Minute:Second
   
     """
-    flSec = float(sec)
-    min, flSec = divmod(flSec, 60)
-    hour, min = divmod(min, 60)
-    return "%d:%02d:%02d" % (hour, min, flSec)
+    minutes, seconds = divmod(int(sec), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def quote_ident(name):
+    """
+    Quotes an identifier for use in external database SQL.
+  
+    Parameters:
+    arg1 (str): Table or column name.
+  
+    Returns:
+    string: double quoted identifier
+  
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def fetch_rows(cursor, size=FETCH_SIZE):
+    """
+    Yields rows from a cursor fetching them in batches.
+  
+    Parameters:
+    arg1 (pyodbc.cursor): Cursor with an executed query.
+    arg2 (int): Number of rows to fetch per round-trip.
+  
+    Returns:
+    generator: rows of the query result
+  
+    """
+    cursor.arraysize = size
+    while chunk := cursor.fetchmany(size):
+        yield from chunk
+
+
+def create_table(description, table_name, conn):
+    """
+    Creates an empty staging table in the staging schema matching a Fernhill cursor description.
+  
+    Parameters:
+    arg1 (tuple): Description of the executed Fernhill cursor.
+    arg2 (str): Name of the historic table the staging table is for.
+    arg3 (sqlalchemy.Connection): Connection to the external database.
+  
+    Returns:
+    n/a
+  
+    """
+    staging_table = f'{quote_ident(STAGING_SCHEMA)}.{quote_ident(table_name)}'
+    columns = ', '.join(f'{quote_ident(col[0])} {PG_TYPES.get(col[1], "TEXT")}' for col in description)
+    conn.execute(text(f'DROP TABLE IF EXISTS {staging_table}'))
+    conn.execute(text(f'CREATE TABLE {staging_table} ({columns}, entryid BIGINT GENERATED ALWAYS AS IDENTITY)'))
+
+
+def swap_table(table_name, conn):
+    """
+    Replaces an external database table with its loaded staging table.
+  
+    Parameters:
+    arg1 (str): Name of the table to replace.
+    arg2 (sqlalchemy.Connection): Connection to the external database.
+  
+    Returns:
+    n/a
+  
+    """
+    staging_table = f'{quote_ident(STAGING_SCHEMA)}.{quote_ident(table_name)}'
+    conn.execute(text(f'ALTER TABLE {staging_table} ADD PRIMARY KEY (entryid)'))
+    conn.execute(text(f'DROP TABLE IF EXISTS public.{quote_ident(table_name)}'))
+    conn.execute(text(f'ALTER TABLE {staging_table} SET SCHEMA public'))
+
+
+def copy_from_pipe(mgr, read_stream, copy_errors):
+    """
+    Runs COPY from the read end of a pipe, used as the target of the copy_rows thread.
+  
+    The read end is always closed when COPY stops, so a writer still filling the pipe gets an error instead of blocking.
+  
+    Parameters:
+    arg1 (CopyManager): pgcopy manager for the target table.
+    arg2 (file): Read end of the pipe.
+    arg3 (list): Collects the error COPY stopped with, if any.
+  
+    Returns:
+    n/a
+  
+    """
+    try:
+        mgr.copystream(read_stream)
+    except Exception as err:
+        copy_errors.append(err)
+    finally:
+        read_stream.close()
+
+
+def copy_rows(rows, table_name, columns, conn):
+    """
+    Bulk loads rows into an existing external database table using binary COPY.
+  
+    Parameters:
+    arg1 (iterable): Rows to load, values in the same order as the columns.
+    arg2 (str): Name of the table to load into.
+    arg3 (list): Column names to load.
+    arg4 (sqlalchemy.Connection): Connection to the external database, committed by the caller.
+  
+    Returns:
+    n/a
+  
+    """
+    mgr = CopyManager(conn.connection.dbapi_connection, table_name, list(columns))
+    read_fd, write_fd = os.pipe()
+    read_stream = os.fdopen(read_fd, 'rb')
+    write_stream = os.fdopen(write_fd, 'wb')
+    copy_errors = []
+    copy_thread = threading.Thread(target=copy_from_pipe, args=(mgr, read_stream, copy_errors))
+    copy_thread.start()
+    pipe_error = None
+    try:
+        mgr.writestream(rows, write_stream)
+    except OSError as err:
+        if err.errno not in PIPE_CLOSED_ERRNOS:
+            raise
+        pipe_error = err
+    finally:
+        try:
+            write_stream.close()
+        except OSError as err:
+            if err.errno not in PIPE_CLOSED_ERRNOS:
+                raise
+            pipe_error = pipe_error or err
+        finally:
+            copy_thread.join()
+    # COPY stopping is what closed the pipe, so its error is the one to report
+    if copy_errors:
+        raise copy_errors[0]
+    if pipe_error is not None:
+        raise pipe_error
 
 
 def hist_data_index(fern_conn, db_engine):
     """
     Checks the historic data index[hdi] of both databases.
   
-    Checks the hdi of fernhill against the hdi of the external database. Removes entries from external db that do not exist in Fernhill.
+    Checks the hdi of fernhill against the hdi of the external database. Removes entries from external db that do not exist in Fernhill. All external db changes are committed together.
   
     Parameters:
     arg1 (pyodbc.conn): Connection object of pyodbc fernhill connection.
     arg2 (dbengine): Engine object from sqlAlchemy for external database.
   
     Returns:
-    n/a
+    list: lowercase names of the Fernhill historic tables
   
     """
-    old_historics = []
-    total_historics = []
-    historic_tables = db_engine.execute("""SELECT table_name
-                                              FROM information_schema.tables
-                                              WHERE table_schema = 'public';"""
-                                        ).fetchall()
-    for row in historic_tables:
-        table_name = row[0]
-        old_historics.append(table_name.lower())
     print("Fetching data to add to table")
     odbc_sql = """ SELECT SourceName, TableName, Units, MinScale, MaxScale, DataType FROM HistoricDataIndex """
     df_fern = pd.read_sql_query(odbc_sql, fern_conn)
-    df_fern.to_sql('historicdataindex', db_engine, index=False, schema='public', if_exists='replace', method='multi', chunksize=1000)
-    for indx in range(len(df_fern)):
-        col2 = df_fern.at[indx, 'TableName']
-        total_historics.append(col2.lower())
-    for entry in old_historics:
-        if entry not in total_historics and entry != 'historicdataindex':
-            db_engine.execute(f"DROP TABLE IF EXISTS {entry}")
-            print(f"Dropping table that is no longer needed {entry}")
+    total_historics = df_fern['TableName'].str.lower().tolist()
+    with db_engine.begin() as conn:
+        historic_tables = conn.execute(text("""SELECT table_name
+                                                 FROM information_schema.tables
+                                                 WHERE table_schema = 'public';""")
+                                       ).fetchall()
+        old_historics = {row[0].lower() for row in historic_tables}
+        df_fern.head(0).to_sql('historicdataindex', conn, index=False, schema='public', if_exists='replace')
+        # pgcopy writes NaN as a value, missing entries have to be None to be stored as NULL
+        df_rows = df_fern.astype(object).where(df_fern.notna(), None)
+        copy_rows(df_rows.itertuples(index=False, name=None), 'historicdataindex', df_fern.columns, conn)
+        old_entries = sorted(old_historics - set(total_historics) - {'historicdataindex', STATUS_TABLE})
+        if old_entries:
+            conn.execute(text(f"DROP TABLE IF EXISTS {', '.join(quote_ident(entry) for entry in old_entries)}"))
+    for entry in old_entries:
+        print(f"Dropping table that is no longer needed {entry}")
     print("Finished Historic Data Index Check!")
+    return total_historics
+
+
+def source_summary(fern_curs, hist_table_name):
+    """
+    Fetches the newest timestamp and row count of a Fernhill historic table.
+  
+    Parameters:
+    arg1 (pyodbc.cursor): Cursor of the fernhill connection.
+    arg2 (str): Name of the historic table.
+  
+    Returns:
+    tuple: newest timestamp and row count, None if the table has no usable timestamp column
+  
+    """
+    try:
+        fern_curs.execute(f"SELECT * FROM {hist_table_name} WHERE 1 = 0")
+        ts_columns = [col[0] for col in fern_curs.description if col[1] is datetime and IDENTIFIER_PATTERN.fullmatch(col[0])]
+        if not ts_columns:
+            return None
+        return tuple(fern_curs.execute(f"SELECT MAX({ts_columns[0]}), COUNT(*) FROM {hist_table_name}").fetchone())
+    except pyodbc.ProgrammingError:
+        return None
+
+
+def table_in_sync(summary, hist_table_name, conn):
+    """
+    Checks whether the external database copy of a table was made from the same Fernhill data.
+  
+    Parameters:
+    arg1 (tuple): Newest timestamp and row count from source_summary.
+    arg2 (str): Name of the historic table.
+    arg3 (sqlalchemy.Connection): Connection to the external database.
+  
+    Returns:
+    boolean: True if the table exists and its last sync matches the summary
+  
+    """
+    synced = conn.execute(text(f"""SELECT src_max_ts, src_rowcount
+                                     FROM {STATUS_TABLE}
+                                     WHERE table_name = :table_name AND to_regclass(:table_ident) IS NOT NULL"""),
+                          {'table_name': hist_table_name, 'table_ident': quote_ident(hist_table_name)}
+                          ).fetchone()
+    return synced is not None and tuple(synced) == summary
+
+
+def record_sync(summary, hist_table_name, conn):
+    """
+    Stores the Fernhill summary a table was copied from in the sync status table.
+  
+    Parameters:
+    arg1 (tuple): Newest timestamp and row count from source_summary.
+    arg2 (str): Name of the historic table.
+    arg3 (sqlalchemy.Connection): Connection to the external database.
+  
+    Returns:
+    n/a
+  
+    """
+    conn.execute(text(f"""INSERT INTO {STATUS_TABLE} (table_name, src_max_ts, src_rowcount, last_synced)
+                          VALUES (:table_name, :src_max_ts, :src_rowcount, now())
+                          ON CONFLICT (table_name) DO UPDATE
+                          SET src_max_ts = EXCLUDED.src_max_ts,
+                              src_rowcount = EXCLUDED.src_rowcount,
+                              last_synced = EXCLUDED.last_synced"""),
+                 {'table_name': hist_table_name, 'src_max_ts': summary[0], 'src_rowcount': summary[1]})
+
+
+class FernhillConnections:
+    """
+    Hands out one Fernhill connection per worker thread.
+  
+    Connections are opened on first use in each thread and reused for the following tables, close_all closes every connection handed out.
+  
+    """
+    def __init__(self, conn_string):
+        self.conn_string = conn_string
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.conns = []
+
+    def get(self):
+        fern_conn = getattr(self.local, 'conn', None)
+        if fern_conn is None:
+            fern_conn = pyodbc.connect(self.conn_string)
+            fern_conn.autocommit = True
+            self.local.conn = fern_conn
+            with self.lock:
+                self.conns.append(fern_conn)
+        return fern_conn
+
+    def discard(self):
+        """Closes the current thread's connection so the next table opens a fresh one."""
+        fern_conn = getattr(self.local, 'conn', None)
+        if fern_conn is None:
+            return
+        self.local.conn = None
+        with self.lock:
+            self.conns.remove(fern_conn)
+        try:
+            fern_conn.close()
+        except pyodbc.Error:
+            pass
 
+    def close_all(self):
+        with self.lock:
+            conns, self.conns = self.conns, []
+        for fern_conn in conns:
+            fern_conn.close()
 
-def hist_data(fern_conn, dbengine):
+
+def copy_table(hist_table_name, fern_conns, dbengine):
+    """
+    Drops an external database table and reinserts the matching Fernhill table.
+  
+    Parameters:
+    arg1 (str): Name of the historic table to copy.
+    arg2 (FernhillConnections): Per thread fernhill connections.
+    arg3 (dbengine): Engine object from sqlAlchemy for external database.
+  
+    Returns:
+    n/a
+  
+    """
+    logger = logging.getLogger()
+    if not isinstance(hist_table_name, str) or not IDENTIFIER_PATTERN.fullmatch(hist_table_name):
+        logger.error(f" Historic table name {hist_table_name!r} is not a valid identifier skipping...")
+        return
+    try:
+        fern_curs = fern_conns.get().cursor()
+        summary = source_summary(fern_curs, hist_table_name)
+        if summary is not None:
+            with dbengine.connect() as conn:
+                if table_in_sync(summary, hist_table_name, conn):
+                    logger.debug(f"{hist_table_name} has not changed since the last update, skipping...")
+                    return
+        logger.debug(f"Starting update for {hist_table_name}...")
+        logger.debug("Running query for information to insert into PostgreSQL...")
+        start = timer()
+        fern_curs.execute(f"SELECT * FROM {hist_table_name}")
+        end = timer()
+        time_taken = round(end - start, 2)
+        logger.debug(f"Fernhill query took {time_taken} to complete.")
+        logger.debug("Starting External Database update.")
+        start = timer()
+        columns = [col[0] for col in fern_curs.description]
+        with dbengine.begin() as conn:
+            for setting in BULK_LOAD_SETTINGS:
+                conn.execute(text(setting))
+            create_table(fern_curs.description, hist_table_name, conn)
+            copy_rows(fetch_rows(fern_curs), f"{STAGING_SCHEMA}.{hist_table_name}", columns, conn)
+            swap_table(hist_table_name, conn)
+            if summary is not None:
+                record_sync(summary, hist_table_name, conn)
+        end = timer()
+        time_taken = round(end - start, 2)
+        logger.debug(f"External Database operations took {time_taken} to complete.")
+    except pyodbc.ProgrammingError:
+        logger.exception(f" Historic table copy of {hist_table_name} returned an error skipping...")
+    except Exception:
+        logger.exception(f" Historic table copy of {hist_table_name} failed skipping...")
+        fern_conns.discard()
+
+
+def hist_data(hist_tables, conn_string, dbengine):
     """
     Drops external database tables and reinserts Fernhill matching table.
   
     Parameters:
-    arg1 (pyodbc.conn): Connection object of pyodbc fernhill connection.
-    arg2 (dbengine): Engine object from sqlAlchemy for external database.
+    arg1 (list): Names of the historic tables from hist_data_index.
+    arg2 (str): pyodbc connection string for fernhill.
+    arg3 (dbengine): Engine object from sqlAlchemy for external database.
   
     Returns:
     n/a
   
     """
     logger = logger_initialize()
-    fern_curs = fern_conn.cursor()
-    odbc_sql = """ SELECT TableName FROM HistoricDataIndex """
-    hist_table = fern_curs.execute(odbc_sql).fetchall()
-    row_count = len(hist_table)
     print("Running database operations...")
     logger.debug("Running database operations...")
-    for row in tqdm(range(row_count)):
-        try:
-            hist_table_name = hist_table[row][0].lower()
-            logger.debug(f"Starting update for {hist_table_name}...")
-            logger.debug("Running query for information to insert into PostgreSQL...")
-            start = timer()
-            df_fern = pd.read_sql_query(f"SELECT * FROM {hist_table_name}", fern_conn)
-            end = timer()
-            time_taken = round(end - start, 2)
-            logger.debug(f"Fernhill query took {time_taken} to complete.")
-            logger.debug("Starting External Database update.")
-            start = timer()
-            df_fern.to_sql(hist_table_name, dbengine, index=False, schema='public', if_exists='replace', method='multi', chunksize=1000)
-            dbengine.execute(f'ALTER TABLE {hist_table_name} ADD COLUMN entryid SERIAL PRIMARY KEY;')
-            end = timer()
-            time_taken = round(end - start, 2)
-            logger.debug(f"External Database operations took {time_taken} to complete.")
-        except pyodbc.ProgrammingError:
-            logger.error(" Historic table copy returned an error skipping...")
+    with dbengine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {STAGING_SCHEMA}"))
+        conn.execute(text(f"""CREATE TABLE IF NOT EXISTS {STATUS_TABLE} (
+                                  table_name TEXT PRIMARY KEY,
+                                  src_max_ts TIMESTAMP,
+                                  src_rowcount BIGINT,
+                                  last_synced TIMESTAMP)"""))
+    fern_conns = FernhillConnections(conn_string)
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(copy_table, hist_table_name, fern_conns, dbengine) for hist_table_name in hist_tables]
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                future.result()
+    finally:
+        fern_conns.close_all()
+
+
+def read_config():
+    """
+    Reads the config file, reusing the parsed config until the file is modified.
+  
+    Parameters:
+    n/a
+  
+    Returns:
+    ConfigParser: parsed config file
+  
+    """
+    global _CONFIG, _CONFIG_MTIME
+    mtime = CONFIG_PATH.stat().st_mtime
+    if _CONFIG is None or mtime != _CONFIG_MTIME:
+        config = ConfigParser()
+        config.read(CONFIG_PATH)
+        _CONFIG, _CONFIG_MTIME = config, mtime
+    return _CONFIG
 
 
 def table_transfer():
@@ -120,18 +466,22 @@ def table_transfer():
   
     """
     
-    root = os.path.abspath(os.path.dirname(__file__))
-    config_path = os.path.join(root + '\config.ini')
-    config = ConfigParser()
-    config.read(config_path)
+    config = read_config()
     # Connect to postgres server
     dbpassword = urllib.parse.quote_plus(config.get('database', 'Password'))
+    # Bulk loads use pgcopy, which only works on psycopg2
+    db_type = config.get('database', 'Type')
+    if db_type == 'postgresql':
+        db_type = 'postgresql+psycopg2'
 
     dbengine = create_engine(
-        config.get('database', 'Type') + "://" + config.get('database', 'Username') + ':' + 
+        db_type + "://" + config.get('database', 'Username') + ':' + 
         dbpassword + '@' + config.get('database', 'Host') + ':' + 
-        config.get('database', 'Port') + '/' + config.get('database', 'DBName')
+        config.get('database', 'Port') + '/' + config.get('database', 'DBName'),
+        pool_size=16, max_overflow=8, pool_pre_ping=True, pool_recycle=3600, future=True
     )
+    if dbengine.dialect.driver != 'psycopg2':
+        raise ValueError(f"Database type {db_type} is not supported, use postgresql or postgresql+psycopg2.")
 
     dbcnxn = dbengine.connect()
     print("PostgreSQL server information")
@@ -141,19 +491,43 @@ def table_transfer():
     dbcnxn.close()
 
     # Connect to fernhill server
-    fern_conn = pyodbc.connect(config.get('fernhill', 'ConnString'))
+    conn_string = config.get('fernhill', 'ConnString')
+    fern_conn = pyodbc.connect(conn_string)
     fern_conn.autocommit = True
 
-    hist_data_index(fern_conn, dbengine)
-    start = timer()
-    hist_data(fern_conn, dbengine)
-    end = timer()
+    try:
+        hist_tables = hist_data_index(fern_conn, dbengine)
+        start = timer()
+        hist_data(hist_tables, conn_string, dbengine)
+        end = timer()
+    finally:
+        fern_conn.close()
     time_taken = end - start
     time_taken = convert_time(time_taken)
-    fern_conn.close()
     return time_taken
 
 
+def run_transfer():
+    """
+    Runs table_transfer for the GUI, logging any error instead of raising it.
+  
+    The GUI only clears its updating flag when the transfer returns, so a failed run must still return for later auto updates to start.
+  
+    Parameters:
+    n/a
+  
+    Returns:
+    string: Hour:Minute:Second the transfer took, None if it failed
+  
+    """
+    try:
+        return table_transfer()
+    except Exception:
+        logger_initialize().exception("SQL update failed")
+        print("SQL update failed, see dbtool.log for details.")
+        return None
+
+
 def config_handling(values, submit):
     """
     Reads config file and sets up settings layout based on whether the fields can be populated or not.
@@ -166,15 +540,14 @@ def config_handling(values, submit):
     list: sg Settings Layout list.
   
     """
-    root = os.path.abspath(os.path.dirname(__file__))
-    config_path = os.path.join(root + '\config.ini')
+    import PySimpleGUI as sg
     config = ConfigParser()
-    if not os.path.isfile(config_path) and not submit:
+    if not CONFIG_PATH.is_file() and not submit:
         config.add_section('database')
         config.add_section('fernhill')
         config.add_section('misc')
         config.set('misc', 'autoupdate', 'True')
-        with open(config_path, 'w') as f:
+        with open(CONFIG_PATH, 'w') as f:
                 config.write(f)
         settings_layout = [
             [sg.Text('Database', size=(65, 1), justification='center')],
@@ -193,10 +566,8 @@ def config_handling(values, submit):
         ]
         return config, settings_layout
 
-    elif os.path.isfile(config_path) and not submit:
-        root = os.path.abspath(os.path.dirname(__file__))
-        config_path = os.path.join(root + '\config.ini')
-        config.read(config_path)
+    elif CONFIG_PATH.is_file() and not submit:
+        config = read_config()
         au1 = config.getboolean('misc', 'autoupdate')
         if not au1:
             au2 = True
@@ -220,7 +591,7 @@ def config_handling(values, submit):
         ]
         return settings_layout
     else:
-        config.read(config_path)
+        config.read(CONFIG_PATH)
         config.set('database', 'Type', values[1])
         config.set('database', 'UserName', values[2])
         config.set('database', 'Password', values[3])
@@ -232,7 +603,7 @@ def config_handling(values, submit):
             config.set('misc', 'autoupdate', 'True')
         else:
             config.set('misc', 'autoupdate', 'False')
-        with open(config_path, 'w') as f:
+        with open(CONFIG_PATH, 'w') as f:
             config.write(f)
 
 
@@ -247,6 +618,7 @@ def layouts(settings_layout):
     list: full window layout list for sg
   
     """
+    import PySimpleGUI as sg
     sg.theme('dark grey 9')
     logging_layout = [
         [sg.Multiline(size=(75, 25), font='Courier 8', expand_x=True, expand_y=False, write_only=True,
@@ -270,6 +642,8 @@ def logger_initialize():
     """
    Sets up and controls the logger.
   
+    The logger is only set up on the first call, later calls return the same logger.
+  
     Parameters:
     n/a
     
@@ -277,25 +651,58 @@ def logger_initialize():
     object: logger object
   
     """
-    logging.basicConfig(filename='dbtool.log',
+    global _LOGGER
+    if _LOGGER is not None:
+        return _LOGGER
+    logging.basicConfig(filename=LOG_PATH,
                         filemode = 'w',
                         format = '%(levelname)s:%(asctime)s - %(message)s',
                         level = logging.ERROR)
     logger = logging.getLogger()
-    root = os.path.abspath(os.path.dirname(__file__))
-    log_path = os.path.join(root + '\dbtool.log')
-    log_handler = logging.FileHandler(log_path)
-    handler_format = logging.Formatter('%(levelname)s:%(asctime)s - %(message)s')
-    log_handler.setFormatter(handler_format)
-    logger.addHandler(log_handler)
+    _LOGGER = logger
     return logger
 
 
 
+def next_run_datetime(now):
+    """
+    Finds the next scheduled auto update after the given time.
+  
+    Parameters:
+    arg1 (datetime): Time to search from.
+  
+    Returns:
+    datetime: date and time of the next auto update
+  
+    """
+    for run_time in UPDATE_TIMES:
+        next_run = datetime.combine(now.date(), run_time)
+        if next_run > now:
+            return next_run
+    return datetime.combine(now.date() + timedelta(days=1), UPDATE_TIMES[0])
+
+
+def read_timeout(next_update):
+    """
+    Works out how long window.read can wait before the next auto update is due.
+  
+    Parameters:
+    arg1 (datetime): Date and time of the next auto update.
+  
+    Returns:
+    int: timeout in milliseconds
+  
+    """
+    remaining = int((next_update - datetime.now()).total_seconds() * 1000)
+    return max(100, min(MAX_READ_TIMEOUT, remaining))
+
+
 def main():
     """
     Main logic to run the gui window and call functions for autoupdate
   
+    The GUI libraries are imported here and in the layout functions so table_transfer can be used without loading Tk.
+  
     Parameters:
     n/a
   
@@ -303,35 +710,31 @@ def main():
     n/a
   
     """
+    import PySimpleGUI as sg
+    from psgtray import SystemTray
     in_tray = False
     updating = False
     logger = logger_initialize()
-    warnings.simplefilter(action='ignore', category=UserWarning)
 
     settings_layout = config_handling(values={}, submit=False)
     layout = layouts(settings_layout)
     window = sg.Window('Fernhill to SQL Database', layout, resizable=False )
 
-    first = time(6, 0, 0)
-    first_start = time(6, 1, 0)
-    second = time(18, 0, 0)
-    second_start = time(18, 1, 0)
+    next_update = next_run_datetime(datetime.now() - UPDATE_WINDOW)
 
     while True:
-        event, values = window.read(timeout=100)
+        event, values = window.read(timeout=read_timeout(next_update))
         # Check for auto update value is set to True and run at correct time
-        if values["-AU1-"]:
-            right_now = datetime.now().time()
-            if right_now > first and right_now < first_start and not updating:
+        right_now = datetime.now()
+        if right_now >= next_update:
+            if values["-AU1-"] and not updating:
                 print(f"Time and date is {datetime.now()}. SQL update is starting...")
                 logger.debug(f"Time and date is {datetime.now()}. SQL update is starting...")
-                window.perform_long_operation(table_transfer, '-UPDATE COMPLETE-')
-                updating = True
-            elif right_now > second and right_now < second_start and not updating:
-                print(f"Time and date is {datetime.now()}. SQL update is starting...")
-                logger.debug(f"Time and date is {datetime.now()}. SQL update is starting...")
-                window.perform_long_operation(table_transfer, '-UPDATE COMPLETE-')
+                window.perform_long_operation(run_transfer, '-UPDATE COMPLETE-')
                 updating = True
+                next_update = next_run_datetime(right_now)
+            elif right_now >= next_update + UPDATE_WINDOW:
+                next_update = next_run_datetime(right_now)
 
         # Check for input from the window
         if event == 'Submit':
@@ -340,7 +743,7 @@ def main():
         elif event == 'Start Update':
             print(f"Time and date is {datetime.now()}. SQL update is starting...")
             logger.debug(f"Time and date is {datetime.now()}. SQL update is starting...")
-            window.perform_long_operation(table_transfer, '-UPDATE COMPLETE-')
+            window.perform_long_operation(run_transfer, '-UPDATE COMPLETE-')
             updating = True
         elif event == '-UPDATE COMPLETE-':
             print("All operations have completed!")
@@ -356,25 +759,25 @@ def main():
             sys_tray.show_icon()
             in_tray = True
             while in_tray:
-                event, values = window.read(timeout=100)
-                right_now = datetime.now().time()
+                event, values = window.read(timeout=read_timeout(next_update))
+                right_now = datetime.now()
 
                 if event == sys_tray.key:
                     #sg.cprint(f'System Tray Event = ', values[event], c='white on red')
                     event = values[event]
-                if values["-AU1-"]:
-                    if right_now > first and right_now < first_start and not updating:
-                        sys_tray.show_message('Starting 6:00am update!')
-                        print(f"Time and date is {datetime.now()}. SQL update is starting...")
-                        logger.debug(f"Time and date is {datetime.now()}. SQL update is starting...")
-                        window.perform_long_operation(table_transfer, '-UPDATE COMPLETE-')
-                        updating = True
-                    elif right_now > second and right_now < second_start and not updating:
-                        sys_tray.show_message('Starting 6:00pm update!')
+                if right_now >= next_update:
+                    if values["-AU1-"] and not updating:
+                        if next_update.hour < 12:
+                            sys_tray.show_message('Starting 6:00am update!')
+                        else:
+                            sys_tray.show_message('Starting 6:00pm update!')
                         print(f"Time and date is {datetime.now()}. SQL update is starting...")
                         logger.debug(f"Time and date is {datetime.now()}. SQL update is starting...")
-                        window.perform_long_operation(table_transfer, '-UPDATE COMPLETE-')
+                        window.perform_long_operation(run_transfer, '-UPDATE COMPLETE-')
                         updating = True
+                        next_update = next_run_datetime(right_now)
+                    elif right_now >= next_update + UPDATE_WINDOW:
+                        next_update = next_run_datetime(right_now)
                 if event == '-UPDATE COMPLETE-':
                     sys_tray.show_message("All operations have completed!")
                     print("All operations have completed!")
@@ -0,0 +1,103 @@
+import errno
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+
+import FernhillDBTransferTool as tool  # noqa: E402
+
+
+class FakeCopyManager:
+    """Stands in for pgcopy, reading the pipe like the server would during COPY."""
+    fail_copy = False
+
+    def __init__(self, conn, table, cols):
+        self.received = b''
+
+    def copystream(self, datastream):
+        if self.fail_copy:
+            raise RuntimeError('COPY failed')
+        self.received = datastream.read()
+
+    def writestream(self, data, datastream):
+        for record in data:
+            datastream.write(repr(record).encode() * 100)
+
+
+class FailingCursor:
+    """Returns one batch of rows and then fails like a dropped Fernhill connection."""
+    def __init__(self):
+        self.calls = 0
+
+    def fetchmany(self, size):
+        self.calls += 1
+        if self.calls > 1:
+            raise pyodbc.ProgrammingError('fetch failed')
+        return [(i, float(i)) for i in range(1000)]
+
+
+def run_copy(rows):
+    conn = SimpleNamespace(connection=SimpleNamespace(dbapi_connection=None))
+    result = {}
+
+    def target():
+        try:
+            tool.copy_rows(rows, 'table', ['a', 'b'], conn)
+        except Exception as err:
+            result['error'] = err
+
+    before = set(threading.enumerate())
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "copy_rows did not return"
+    assert set(threading.enumerate()) <= before, "COPY thread left running"
+    return result.get('error')
+
+
+def test_fetch_failure_mid_table_stops_copy(monkeypatch):
+    monkeypatch.setattr(tool, 'CopyManager', FakeCopyManager)
+    cursor = FailingCursor()
+    error = run_copy(tool.fetch_rows(cursor, size=1000))
+    assert isinstance(error, pyodbc.ProgrammingError)
+    assert cursor.calls == 2
+
+
+def test_copy_failure_does_not_block_writer(monkeypatch):
+    monkeypatch.setattr(tool, 'CopyManager', FakeCopyManager)
+    monkeypatch.setattr(FakeCopyManager, 'fail_copy', True)
+    error = run_copy((i, float(i)) for i in range(100000))
+    assert isinstance(error, RuntimeError)
+
+
+def test_windows_pipe_error_reports_copy_failure(monkeypatch):
+    class WindowsPipeCopyManager(FakeCopyManager):
+        fail_copy = True
+
+        def writestream(self, data, datastream):
+            try:
+                super().writestream(data, datastream)
+            except BrokenPipeError:
+                raise OSError(errno.EINVAL, 'Invalid argument')
+
+    monkeypatch.setattr(tool, 'CopyManager', WindowsPipeCopyManager)
+    error = run_copy((i, float(i)) for i in range(100000))
+    assert isinstance(error, RuntimeError)
+
+
+def test_rows_reach_copy(monkeypatch):
+    managers = []
+
+    class RecordingCopyManager(FakeCopyManager):
+        def __init__(self, conn, table, cols):
+            super().__init__(conn, table, cols)
+            managers.append(self)
+
+    monkeypatch.setattr(tool, 'CopyManager', RecordingCopyManager)
+    assert run_copy([(1, 1.0), (2, 2.0)]) is None
+    assert managers[0].received == repr((1, 1.0)).encode() * 100 + repr((2, 2.0)).encode() * 100
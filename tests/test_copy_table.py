@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+import FernhillDBTransferTool as tool  # noqa: E402
+
+
+class BrokenCursor:
+    def execute(self, sql):
+        raise RuntimeError('connection lost')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.autocommit = False
+
+    def cursor(self):
+        return BrokenCursor()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(conn_string):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(tool.pyodbc, 'connect', connect)
+    return opened
+
+
+def test_connection_reused_per_thread(connections):
+    fern_conns = tool.FernhillConnections('DSN=fernhill')
+    assert fern_conns.get() is fern_conns.get()
+    fern_conns.close_all()
+    assert len(connections) == 1
+    assert connections[0].closed
+
+
+def test_failed_table_is_logged_and_connection_discarded(connections, caplog):
+    fern_conns = tool.FernhillConnections('DSN=fernhill')
+    tool.copy_table('tag1', fern_conns, None)
+    tool.copy_table('tag2', fern_conns, None)
+    assert 'tag1 failed' in caplog.text
+    assert 'tag2 failed' in caplog.text
+    assert len(connections) == 2
+    assert all(conn.closed for conn in connections)
+    assert fern_conns.conns == []
@@ -0,0 +1,128 @@
+import logging
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+import FernhillDBTransferTool as tool  # noqa: E402
+
+NEWEST = datetime(2024, 1, 1, 12, 0)
+TIMESTAMP_DESCRIPTION = [('recorddate', datetime), ('value', float)]
+PLAIN_DESCRIPTION = [('name', str), ('value', float)]
+
+
+class FakeCursor:
+    def __init__(self, description, summary):
+        self.description = description
+        self.summary = summary
+
+    def execute(self, sql):
+        return self
+
+    def fetchone(self):
+        return self.summary
+
+    def fetchmany(self, size):
+        return []
+
+
+class FakeFernhillConnections:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def get(self):
+        return self
+
+    def cursor(self):
+        return self._cursor
+
+    def discard(self):
+        pass
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeDatabase:
+    """Keeps the sync status rows and the public tables that copy_table queries see."""
+
+    def __init__(self, status=None, tables=()):
+        self.status = dict(status or {})
+        self.tables = {tool.quote_ident(name) for name in tables}
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT src_max_ts, src_rowcount") and tool.STATUS_TABLE in sql:
+            row = self.status.get(params['table_name'])
+            return FakeResult(row if params['table_ident'] in self.tables else None)
+        if sql.startswith(f"INSERT INTO {tool.STATUS_TABLE}"):
+            self.status[params['table_name']] = (params['src_max_ts'], params['src_rowcount'])
+        return FakeResult(None)
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    tables = []
+
+    def swap_table(table_name, conn):
+        tables.append(table_name)
+        conn.tables.add(tool.quote_ident(table_name))
+
+    monkeypatch.setattr(tool, 'create_table', lambda description, table_name, conn: None)
+    monkeypatch.setattr(tool, 'copy_rows', lambda rows, table_name, columns, conn: list(rows))
+    monkeypatch.setattr(tool, 'swap_table', swap_table)
+    return tables
+
+
+def copy(db, description=TIMESTAMP_DESCRIPTION, summary=(NEWEST, 10)):
+    fern_conns = FakeFernhillConnections(FakeCursor(description, summary))
+    tool.copy_table('tag1', fern_conns, db)
+
+
+def test_matching_summary_is_skipped(loaded, caplog):
+    caplog.set_level(logging.DEBUG)
+    db = FakeDatabase({'tag1': (NEWEST, 10)}, tables=['tag1'])
+    copy(db)
+    assert loaded == []
+    assert 'tag1 has not changed' in caplog.text
+
+
+@pytest.mark.parametrize('synced', [(NEWEST, 9), (NEWEST - timedelta(minutes=1), 10)],
+                         ids=['rowcount', 'timestamp'])
+def test_changed_summary_is_reloaded(loaded, synced):
+    db = FakeDatabase({'tag1': synced}, tables=['tag1'])
+    copy(db)
+    assert loaded == ['tag1']
+    assert db.status['tag1'] == (NEWEST, 10)
+    copy(db)
+    assert loaded == ['tag1']
+
+
+def test_missing_table_is_reloaded(loaded):
+    db = FakeDatabase({'tag1': (NEWEST, 10)})
+    copy(db)
+    assert loaded == ['tag1']
+
+
+def test_table_without_timestamp_is_always_copied(loaded):
+    db = FakeDatabase()
+    copy(db, description=PLAIN_DESCRIPTION)
+    copy(db, description=PLAIN_DESCRIPTION)
+    assert loaded == ['tag1', 'tag1']
+    assert db.status == {}